@@ -1,47 +1,52 @@
 import streamlit as st
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
-from sklearn.feature_extraction.text import TfidfVectorizer
-import io
-from transformers import pipeline
+import numpy as np
+import functools
+import os
+from src.snapshot import current_version, load_snapshot, pie_counts, snapshot_texts
 
-# Initialize sentiment classifier
+# Plotting, TF-IDF, the classifier and the similarity index are imported
+# inside the handlers that use them, so a cold start only maps the snapshot
+
+# Sentiment classifier, loaded only when a review is analyzed
 @st.cache_resource
 def load_classifier():
     try:
+        from transformers import pipeline
         return pipeline('sentiment-analysis', model='nlptown/bert-base-multilingual-uncased-sentiment')
     except Exception as e:
         st.error(f"Failed to load classifier: {e}")
         st.stop()
 
-classifier = load_classifier()
+# Memory-mapped dashboard snapshot built by src/snapshot.py; only the
+# current version stays cached, so superseded versions are released
+@st.cache_resource(max_entries=1)
+def get_snapshot(version):
+    return load_snapshot(version)
+
+# Load the similarity index built by src/theme_discovery.py
+@st.cache_resource
+def load_index():
+    try:
+        from src.theme_discovery import INDEX_META_PATH, load_similarity_index
+        return load_similarity_index(), pd.read_csv(INDEX_META_PATH, encoding='utf-8')
+    except ImportError as e:
+        st.warning(f"Similar-review search unavailable: {e}")
+        return None, None
 
 # Functions
 def extract_keywords(texts, top_n=20):
     """
     Extract top keywords/n-grams using TF-IDF.
     """
-    if texts.empty:  # Check if Series is empty
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    texts = pd.Series(texts).dropna()
+    if texts.empty:
         return []
     vectorizer = TfidfVectorizer(max_features=top_n, ngram_range=(1, 2), lowercase=False)
     vectorizer.fit_transform(texts)
     return vectorizer.get_feature_names_out().tolist()
 
-def group_themes(keywords):
-    """
-    Group keywords into themes, including Amharic equivalents.
-    """
-    themes = {
-        'Pricing': ['price', 'cost', 'expensive', 'cheap', 'fare', 'costly', 'affordable', 'ዋጋ', 'ወጪ', 'ውድ', 'ርካሽ'],
-        'Safety': ['safe', 'safety', 'dangerous', 'secure', 'risk', 'unsafe', 'ደህንነት', 'አደገኛ', 'አስተማማኝ'],
-        'Usability': ['app', 'interface', 'easy', 'user', 'navigate', 'friendly', 'bug', 'መተግበሪያ', 'ቀላል', 'ተጠቃሚ'],
-        'Service': ['driver', 'service', 'customer', 'support', 'staff', 'ride', 'ነዳይ', 'አገልግሎት', 'ደንበኛ', 'ድጋፍ'],
-        'Reliability': ['reliable', 'delay', 'wait', 'time', 'late', 'prompt', 'ታማኝ', 'መዘግየት', 'ጠብቅ', 'ጊዜ']
-    }
-    grouped = {theme: [kw for kw in keywords if any(t in kw.lower() for t in words)] for theme, words in themes.items()}
-    return grouped
-
 def classify_sentiment(text):
     """
     Classify sentiment for a single review.
@@ -49,7 +54,7 @@ def classify_sentiment(text):
     if not isinstance(text, str) or not text.strip():
         return 'neutral'
     try:
-        result = classifier(text[:512])[0]
+        result = load_classifier()(text[:512])[0]
         score = int(result['label'].split()[0])
         if score >= 4:
             return 'positive'
@@ -59,158 +64,151 @@ def classify_sentiment(text):
     except:
         return 'neutral'
 
-def plot_to_bytes(fig):
+def filter_rows(snapshot, app_choice, sentiment_choice, theme_choice):
+    """
+    Row positions matching the sidebar filters, from the snapshot's code arrays and theme index.
+    """
+    mask = np.ones(snapshot['num_reviews'], dtype=bool)
+    if app_choice != 'All':
+        mask &= snapshot['app'] == snapshot['apps'].index(app_choice)
+    if sentiment_choice != 'All':
+        mask &= snapshot['sentiment'] == snapshot['sentiments'].index(sentiment_choice)
+    if theme_choice != 'All':
+        mask &= (snapshot['theme_bits'] & (1 << list(snapshot['themes']).index(theme_choice))) != 0
+    return np.flatnonzero(mask)
+
+def row_labels(snapshot, rows):
     """
-    Convert matplotlib figure to bytes for Streamlit.
+    App and sentiment labels for the given rows.
     """
-    buf = io.BytesIO()
-    fig.savefig(buf, format='png', bbox_inches='tight')
-    buf.seek(0)
-    return buf.getvalue()
+    apps = np.array(snapshot['apps'] + [''])[snapshot['app'][rows]]
+    sentiments = np.array(snapshot['sentiments'] + [''])[snapshot['sentiment'][rows]]  # -1 (unlabelled) maps to ''
+    return apps, sentiments
+
+# Full CSVs get large at scale, so only a few recent downloads are kept
+@st.cache_data(max_entries=4, ttl=600)
+def filtered_csv(version, app_choice, sentiment_choice, theme_choice):
+    snapshot = get_snapshot(version)
+    rows = filter_rows(snapshot, app_choice, sentiment_choice, theme_choice)
+    apps, sentiments = row_labels(snapshot, rows)
+    return pd.DataFrame({'app': apps, 'content': snapshot_texts(snapshot, rows), 'sentiment': sentiments}).to_csv(index=False)
+
+@st.cache_data(max_entries=64, ttl=3600)
+def pie_chart(title, labels, counts):
+    from src.visualization import pie_chart_png
+    return pie_chart_png(title, pd.Series(counts, index=labels))
+
+def show_pie(snapshot, rows, app, unfiltered):
+    """
+    Pie chart of sentiment counts for the given rows of one app. The
+    unfiltered chart comes prerendered from the snapshot.
+    """
+    if unfiltered:
+        if app in snapshot['charts']['pies']:
+            st.image(snapshot['charts']['pies'][app])
+        return
+    counts = pie_counts(snapshot['sentiment'][rows], snapshot['sentiments'])
+    if not counts.empty:
+        st.image(pie_chart(f'{app} Sentiment Distribution', tuple(counts.index), tuple(int(c) for c in counts)))
+
+# Load the current snapshot
+version = current_version()
+snapshot = get_snapshot(version) if version else None
+if snapshot is None:
+    st.error("No dashboard snapshot found. Run `python -m src.snapshot` to build it.")
+    st.stop()
 
 # Streamlit app
-st.title('RIDE vs Feres Sentiment & Theme Analyzer')
-
-# Load data
-try:
-    ride_df = pd.read_csv('data/processed/ride_cleaned.csv', encoding='utf-8')
-    feres_df = pd.read_csv('data/processed/feres_cleaned.csv', encoding='utf-8')
-    ride_df['app'] = 'RIDE'
-    feres_df['app'] = 'Feres'
-    combined_df = pd.concat([ride_df, feres_df])
-except Exception as e:
-    st.error(f"Error loading data: {e}")
-    st.stop()
+st.title(f"{' vs '.join(snapshot['apps'])} Sentiment & Theme Analyzer")
 
 # Sidebar for filtering
 st.sidebar.header('Filter Reviews')
-app_choice = st.sidebar.selectbox('Select App', ['Both', 'RIDE', 'Feres'])
-sentiment_choice = st.sidebar.selectbox('Select Sentiment', ['All', 'positive', 'negative', 'neutral'])
-theme_choice = st.sidebar.selectbox('Select Theme', ['All', 'Pricing', 'Safety', 'Usability', 'Service', 'Reliability'])
+app_choice = st.sidebar.selectbox('Select App', ['All'] + snapshot['apps'])
+sentiment_choice = st.sidebar.selectbox('Select Sentiment', ['All'] + snapshot['sentiments'])
+theme_choice = st.sidebar.selectbox('Select Theme', ['All'] + list(snapshot['themes']))
 num_reviews = st.sidebar.slider('Number of Reviews to Display', 1, 50, 10)
 
 # Summary stats
 st.sidebar.subheader('Summary Stats')
-st.sidebar.write(f"Total Reviews: {len(combined_df)}")
-for sentiment in ['positive', 'negative', 'neutral']:
-    count = len(combined_df[combined_df['sentiment'] == sentiment])
+st.sidebar.write(f"Total Reviews: {snapshot['num_reviews']}")
+for sentiment in snapshot['sentiments']:
+    count = sum(counts.get(sentiment, 0) for counts in snapshot['sentiment_counts'].values())
     st.sidebar.write(f"{sentiment.capitalize()}: {count}")
 
 # Filter data
-filtered_df = combined_df
-if app_choice != 'Both':
-    filtered_df = filtered_df[filtered_df['app'] == app_choice]
-if sentiment_choice != 'All':
-    filtered_df = filtered_df[filtered_df['sentiment'] == sentiment_choice]
-if theme_choice != 'All':
-    theme_keywords = {
-        'Pricing': ['price', 'cost', 'expensive', 'cheap', 'fare', 'costly', 'affordable', 'ዋጋ', 'ወጪ', 'ውድ', 'ርካሽ'],
-        'Safety': ['safe', 'safety', 'dangerous', 'secure', 'risk', 'unsafe', 'ደህንነት', 'አደገኛ', 'አስተማማኝ'],
-        'Usability': ['app', 'interface', 'easy', 'user', 'navigate', 'friendly', 'bug', 'መተግበሪያ', 'ቀላል', 'ተጠቃሚ'],
-        'Service': ['driver', 'service', 'customer', 'support', 'staff', 'ride', 'ነዳይ', 'አገልግሎት', 'ደንበኛ', 'ድጋፍ'],
-        'Reliability': ['reliable', 'delay', 'wait', 'time', 'late', 'prompt', 'ታማኝ', 'መዘግየት', 'ጠብቅ', 'ጊዜ']
-    }
-    filtered_df = filtered_df[filtered_df['cleaned_content'].apply(lambda x: any(kw in str(x).lower() for kw in theme_keywords[theme_choice]) if isinstance(x, str) else False)]
+rows = filter_rows(snapshot, app_choice, sentiment_choice, theme_choice)
 
 # Display filtered reviews with keyword highlighting
 st.header('Filtered Reviews')
-st.write(f'Showing {len(filtered_df)} reviews')
-if not filtered_df.empty:
-    for index, row in filtered_df[['app', 'content', 'sentiment']].head(num_reviews).iterrows():
-        content = row['content']
+st.write(f'Showing {len(rows)} reviews')
+if len(rows):
+    shown = rows[:num_reviews]
+    apps, sentiments = row_labels(snapshot, shown)
+    for app, content, sentiment in zip(apps, snapshot_texts(snapshot, shown), sentiments):
         if theme_choice != 'All':
-            for kw in theme_keywords[theme_choice]:
+            for kw in snapshot['themes'][theme_choice]:
                 content = content.replace(kw, f"**{kw}**")
-        st.markdown(f"**{row['app']}**: {content} ({row['sentiment']})")
+        st.markdown(f"**{app}**: {content} ({sentiment})")
 
 # Download button for filtered reviews
-if not filtered_df.empty:
-    csv = filtered_df[['app', 'content', 'sentiment']].to_csv(index=False)
+if len(rows):
+    # The CSV is built only when the button is clicked, not on every render
+    csv = functools.partial(filtered_csv, version, app_choice, sentiment_choice, theme_choice)
     st.download_button("Download Filtered Reviews", csv, "filtered_reviews.csv", "text/csv")
 
 # Sentiment visualizations
 st.header('Sentiment Analysis')
-if app_choice == 'Both':
-    for app in ['RIDE', 'Feres']:
-        df = filtered_df[filtered_df['app'] == app]
-        if not df.empty:
-            sentiment_counts = df['sentiment'].value_counts()
-            fig, ax = plt.subplots(figsize=(6, 6))
-            ax.pie(sentiment_counts, labels=sentiment_counts.index, autopct='%1.1f%%', startangle=90, colors=['#66b3ff', '#ff9999', '#99ff99'])
-            ax.set_title(f'{app} Sentiment Distribution')
-            st.image(plot_to_bytes(fig))
-            plt.close()
+unfiltered = sentiment_choice == 'All' and theme_choice == 'All'
+if app_choice == 'All':
+    for code, app in enumerate(snapshot['apps']):
+        show_pie(snapshot, rows[snapshot['app'][rows] == code], app, unfiltered)
 else:
-    if not filtered_df.empty:
-        sentiment_counts = filtered_df['sentiment'].value_counts()
-        fig, ax = plt.subplots(figsize=(6, 6))
-        ax.pie(sentiment_counts, labels=sentiment_counts.index, autopct='%1.1f%%', startangle=90, colors=['#66b3ff', '#ff9999', '#99ff99'])
-        ax.set_title(f'{app_choice} Sentiment Distribution')
-        st.image(plot_to_bytes(fig))
-        plt.close()
+    show_pie(snapshot, rows, app_choice, unfiltered)
 
 # Thematic comparison
 st.header('Thematic Comparison')
-theme_data = []
-for app, df in [('RIDE', ride_df), ('Feres', feres_df)]:
-    for sentiment in ['positive', 'negative']:
-        texts = df[df['sentiment'] == sentiment]['cleaned_content'].dropna()
-        keywords = extract_keywords(texts)
-        if keywords:
-            grouped = group_themes(keywords)
-            for theme, kws in grouped.items():
-                if kws:
-                    theme_data.append({
-                        'App': app,
-                        'Sentiment': sentiment,
-                        'Theme': theme,
-                        'KeywordCount': len(kws)
-                    })
-
-if theme_data:
-    theme_df = pd.DataFrame(theme_data)
-    for sentiment in ['positive', 'negative']:
-        sentiment_df = theme_df[theme_df['Sentiment'] == sentiment]
-        if not sentiment_df.empty:
-            fig, ax = plt.subplots(figsize=(10, 6))
-            sns.barplot(data=sentiment_df, x='Theme', y='KeywordCount', hue='App', palette='Set2', ax=ax)
-            ax.set_title(f'Theme Comparison: RIDE vs Feres ({sentiment.capitalize()} Sentiment)')
-            ax.set_xlabel('Theme')
-            ax.set_ylabel('Number of Keywords')
-            plt.xticks(rotation=45)
-            st.image(plot_to_bytes(fig))
-            plt.close()
-
-    # Print where each app outperforms
-    st.subheader('Where Each App Outperforms')
+if snapshot['theme_data']:
+    for image in snapshot['charts']['themes'].values():
+        st.image(image)
+
+    # Rank every app on each theme
+    st.subheader('App Rankings by Theme')
     for sentiment in ['positive', 'negative']:
         st.write(f"{sentiment.capitalize()} Sentiment:")
-        sentiment_df = theme_df[theme_df['Sentiment'] == sentiment]
-        if sentiment_df.empty:
+        if sentiment not in snapshot['theme_rankings']:
             st.write(f"No themes for {sentiment} sentiment")
             continue
-        for theme in sentiment_df['Theme'].unique():
-            theme_subset = sentiment_df[sentiment_df['Theme'] == theme]
-            ride_count = theme_subset[theme_subset['App'] == 'RIDE']['KeywordCount'].sum()
-            feres_count = theme_subset[theme_subset['App'] == 'Feres']['KeywordCount'].sum()
-            if ride_count > feres_count:
-                st.write(f"  {theme}: RIDE outperforms Feres ({ride_count} vs {feres_count} keywords)")
-            elif feres_count > ride_count:
-                st.write(f"  {theme}: Feres outperforms RIDE ({feres_count} vs {ride_count} keywords)")
-            else:
-                st.write(f"  {theme}: RIDE and Feres are equal ({ride_count} keywords)")
+        for theme, ranking in snapshot['theme_rankings'][sentiment]:
+            st.write(f"  {theme}: {ranking} keywords")
 
 # Input new review
 st.header('Analyze a New Review')
 new_review = st.text_area('Enter a review (English or Amharic):')
 if st.button('Analyze'):
     if new_review:
+        from src.visualization import group_themes
         sentiment = classify_sentiment(new_review)
-        keywords = extract_keywords([new_review])  # Wrap in list for single review
+        keywords = extract_keywords([new_review])
         themes = group_themes(keywords)
         st.write(f'Sentiment: {sentiment}')
         st.write('Themes:', {k: v for k, v in themes.items() if v})
 
+# Find similar reviews
+st.header('Find Similar Reviews')
+query = st.text_area('Enter a review to find similar ones:')
+num_similar = st.slider('Number of Similar Reviews', 1, 50, 10)
+if st.button('Find Similar'):
+    if query:
+        from src.theme_discovery import INDEX_PATH, INDEX_META_PATH, find_similar_reviews
+        if not (os.path.exists(INDEX_PATH) and os.path.exists(INDEX_META_PATH)):
+            st.write('No similarity index found. Run `python -m src.theme_discovery` to build it.')
+        else:
+            index, index_meta = load_index()
+            if index is not None:
+                similar = find_similar_reviews(query, index, index_meta, k=num_similar)
+                for _, row in similar.iterrows():
+                    st.markdown(f"**{row['app']}** ({row['similarity']:.2f}): {row['content']} ({row.get('sentiment', '')})")
+
 # Instructions
 st.sidebar.markdown("""
 ### Instructions
@@ -218,4 +216,5 @@ st.sidebar.markdown("""
 - View sentiment pie charts and thematic bar plots.
 - Download filtered reviews as CSV.
 - Enter a new review to analyze it in real-time.
-""")
\ No newline at end of file
+- Find reviews similar to any text using the similarity index.
+""")
@@ -0,0 +1,66 @@
+import json
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+def print_flush(message):
+    print(message, flush=True)
+
+# Override with the APP_REGISTRY environment variable to track a different set of apps
+REGISTRY_PATH = os.environ.get('APP_REGISTRY', os.path.join('config', 'apps.json')).replace('\\', '/')
+
+def load_apps(path=REGISTRY_PATH):
+    """
+    Load the app registry: a list of dicts with name, display_name,
+    play_store_id and countries.
+    """
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    apps = []
+    for entry in config.get('apps', []):
+        if 'name' not in entry or 'play_store_id' not in entry:
+            raise ValueError(f"App entry in {path} needs 'name' and 'play_store_id': {entry}")
+        apps.append({
+            'name': entry['name'],
+            'display_name': entry.get('display_name', entry['name'].capitalize()),
+            'play_store_id': entry['play_store_id'],
+            'countries': entry.get('countries', ['et', 'us'])
+        })
+    if len({app['name'] for app in apps}) != len(apps):
+        raise ValueError(f"Duplicate app names in {path}")
+    return apps
+
+def app_names(apps=None):
+    """
+    Registry names, used in file paths (e.g. data/processed/<name>_cleaned.csv).
+    """
+    return [app['name'] for app in (apps if apps is not None else load_apps())]
+
+def display_names(apps=None):
+    """
+    Mapping of registry name to display name.
+    """
+    return {app['name']: app['display_name'] for app in (apps if apps is not None else load_apps())}
+
+def run_per_app(func, names=None, max_workers=None, use_threads=False):
+    """
+    Run func(name) for every app in a worker pool and return {name: result}.
+    Use threads for I/O-bound stages, processes for CPU-bound Python work.
+    """
+    names = names if names is not None else app_names()
+    if not names:
+        return {}
+    max_workers = max_workers or min(len(names), os.cpu_count() or 1)
+    executor_cls = ThreadPoolExecutor if use_threads else ProcessPoolExecutor
+    results = {}
+    with executor_cls(max_workers=max_workers) as executor:
+        futures = {name: executor.submit(func, name) for name in names}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                # For process workers the chained cause carries the worker-side traceback
+                details = ''.join(traceback.format_exception(type(e), e, e.__traceback__))
+                print_flush(f"Error processing {name}: {e}\n{details}")
+                results[name] = None
+    return results
@@ -46,6 +46,7 @@ import json
 import os
 from google_play_scraper import Sort, reviews
 from time import sleep
+from src.app_registry import load_apps, run_per_app
 
 def scrape_reviews(app_id, lang='en', countries=['et', 'us'], total_count=1000, retry=3):
     """
@@ -85,25 +86,27 @@ def scrape_reviews(app_id, lang='en', countries=['et', 'us'], total_count=1000,
 
     return all_reviews
 
+def save_app_reviews(app):
+    """
+    Scrape and save reviews for a single registry app.
+    """
+    reviews_data = scrape_reviews(app['play_store_id'], countries=app['countries'], total_count=1000)
+    if reviews_data:
+        file_path = f"data/raw/{app['name']}_reviews.json"
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(reviews_data, f, ensure_ascii=False, indent=4,default=str)
+        print(f"Saved {len(reviews_data)} reviews for {app['name']} to {file_path}")
+    else:
+        print(f"No reviews scraped for {app['name']}")
+    return len(reviews_data)
+
 def save_reviews():
     """
-    Scrape and save reviews for Ride and Feres.
+    Scrape and save reviews for every app in the registry, in parallel.
     """
-    apps = {
-        'ride': 'com.multibrains.taxi.passenger.ridepassengeret',
-        'feres': 'com.feres.user'
-    }
+    apps = {app['name']: app for app in load_apps()}
     os.makedirs('data/raw', exist_ok=True)
-
-    for app_name, app_id in apps.items():
-        reviews_data = scrape_reviews(app_id, total_count=1000)
-        if reviews_data:
-            file_path = f'data/raw/{app_name}_reviews.json'
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(reviews_data, f, ensure_ascii=False, indent=4,default=str)
-            print(f"Saved {len(reviews_data)} reviews for {app_name} to {file_path}")
-        else:
-            print(f"No reviews scraped for {app_name}")
+    run_per_app(lambda name: save_app_reviews(apps[name]), list(apps), use_threads=True)
 
 if __name__ == "__main__":
     save_reviews()
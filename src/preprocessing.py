@@ -5,6 +5,7 @@ from nltk.tokenize import word_tokenize
 import nltk
 import os
 import sys
+from src.app_registry import run_per_app
 
 # Ensure output is not buffered
 def print_flush(message):
@@ -100,13 +101,20 @@ def preprocess_reviews(app_name):
         print_flush(f"Unexpected error preprocessing {app_name}: {e}")
         return None
 
+def preprocess_app(app_name):
+    """
+    Pool worker: preprocess one app and return only its row count, so the
+    DataFrame is not pickled back to the parent process.
+    """
+    df = preprocess_reviews(app_name)
+    return None if df is None else len(df)
+
 if __name__ == "__main__":
     print_flush("Starting preprocessing script...")
-    for app in ['ride', 'feres']:
-        print_flush(f"\nProcessing {app}...")
-        result = preprocess_reviews(app)
+    results = run_per_app(preprocess_app)
+    for app, result in results.items():
         if result is not None:
-            print_flush(f"Successfully processed {app} with {len(result)} reviews")
+            print_flush(f"Successfully processed {app} with {result} reviews")
         else:
             print_flush(f"Failed to process {app}")
         print_flush("-" * 50)
\ No newline at end of file
@@ -2,7 +2,11 @@ import pandas as pd
 from transformers import pipeline
 import os
 import sys
+import hashlib
+import shutil
+import time
 from tqdm import tqdm  # For progress bar
+from src.app_registry import app_names
 
 # Ensure output is not buffered
 def print_flush(message):
@@ -17,27 +21,110 @@ except Exception as e:
     print_flush(f"Error initializing classifier: {e}")
     sys.exit(1)
 
+CHECKPOINT_DIR = os.path.join('data', 'checkpoints').replace('\\', '/')
+CHUNK_SIZE = 200  # Reviews classified per committed checkpoint chunk
+
 def classify_sentiment(text):
     """
     Classify sentiment using Hugging Face multilingual model.
+    Errors are raised to the caller so failed reviews can be recorded and retried.
     """
     if not isinstance(text, str) or not text.strip():
         return 'neutral'
-    try:
-        result = classifier(text[:512])[0]  # Truncate to 512 tokens
-        score = int(result['label'].split()[0])  # Extract star rating (1-5)
-        if score >= 4:
-            return 'positive'
-        elif score == 3:
-            return 'neutral'
-        return 'negative'
-    except Exception as e:
-        print_flush(f"Error classifying text '{text[:50]}...': {e}")
+    result = classifier(text[:512])[0]  # Truncate to 512 tokens
+    score = int(result['label'].split()[0])  # Extract star rating (1-5)
+    if score >= 4:
+        return 'positive'
+    elif score == 3:
         return 'neutral'
+    return 'negative'
+
+def write_atomic(df, path):
+    """
+    Write a CSV to a temporary file, fsync it, then rename it over the
+    target so readers never see a partial file, even after a power loss.
+    """
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'w', encoding='utf-8', newline='') as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # Persist the rename itself (directories cannot be opened for fsync on Windows)
+    if hasattr(os, 'O_DIRECTORY'):
+        dir_fd = os.open(os.path.dirname(path) or '.', os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(dir_fd)
+        finally:
+            os.close(dir_fd)
+
+def text_hash(text):
+    """
+    Digest of a review's cleaned text, stored with each checkpoint record so
+    a label is only reused while the text it was computed from is unchanged.
+    """
+    return hashlib.blake2b(str(text).encode('utf-8'), digest_size=16).hexdigest()
+
+def load_checkpoint(checkpoint_dir):
+    """
+    Latest committed result per reviewId across all checkpoint chunks.
+    """
+    chunk_files = sorted(f for f in os.listdir(checkpoint_dir) if f.startswith('chunk_') and f.endswith('.csv'))
+    if not chunk_files:
+        return pd.DataFrame(columns=['reviewId', 'text_hash', 'sentiment', 'error']), 0
+    chunks = []
+    for f in chunk_files:
+        try:
+            chunk = pd.read_csv(os.path.join(checkpoint_dir, f), encoding='utf-8', dtype={'reviewId': str, 'text_hash': str})
+            if not {'reviewId', 'text_hash', 'sentiment', 'error'}.issubset(chunk.columns):
+                raise ValueError("missing columns")
+            chunks.append(chunk)
+        except (ValueError, pd.errors.ParserError) as e:  # EmptyDataError is a ValueError
+            # Its reviews simply become pending again
+            print_flush(f"Warning: skipping unreadable checkpoint chunk {f}: {e}")
+    if not chunks:
+        return pd.DataFrame(columns=['reviewId', 'text_hash', 'sentiment', 'error']), int(chunk_files[-1][len('chunk_'):-len('.csv')]) + 1
+    results = pd.concat(chunks, ignore_index=True).drop_duplicates(subset=['reviewId'], keep='last')
+    return results, int(chunk_files[-1][len('chunk_'):-len('.csv')]) + 1
+
+def classify_chunks(pending, checkpoint_dir, next_chunk, desc):
+    """
+    Classify pending reviews chunk by chunk, committing each chunk atomically.
+    Returns the number of reviews processed and the next chunk number.
+    """
+    processed = 0
+    with tqdm(total=len(pending), desc=desc) as progress:
+        for start in range(0, len(pending), CHUNK_SIZE):
+            chunk = pending.iloc[start:start + CHUNK_SIZE]
+            records = []
+            for review_id, hashed, text in zip(chunk['reviewId'], chunk['text_hash'], chunk['cleaned_content']):
+                try:
+                    records.append({'reviewId': review_id, 'text_hash': hashed, 'sentiment': classify_sentiment(text), 'error': None})
+                except Exception as e:
+                    records.append({'reviewId': review_id, 'text_hash': hashed, 'sentiment': None, 'error': f"{type(e).__name__}: {e}"})
+                progress.update(1)
+            write_atomic(pd.DataFrame(records, columns=['reviewId', 'text_hash', 'sentiment', 'error']),
+                         os.path.join(checkpoint_dir, f'chunk_{next_chunk:06d}.csv'))
+            next_chunk += 1
+            processed += len(chunk)
+    return processed, next_chunk
+
+def current_results(df, checkpoint_dir):
+    """
+    Checkpoint results whose text hash still matches the review, so labels
+    for edited reviews are recomputed rather than reused.
+    """
+    results, next_chunk = load_checkpoint(checkpoint_dir)
+    current = results.merge(df[['reviewId', 'text_hash']], on=['reviewId', 'text_hash'])
+    return current, next_chunk
 
 def analyze_sentiment(app_name):
     """
     Apply sentiment analysis to all cleaned reviews.
+    Progress is checkpointed per chunk under data/checkpoints/<app>, so an
+    interrupted run resumes where it stopped. Failed reviews get one retry
+    pass; any still failing are left unlabelled and written to
+    data/processed/<app>_sentiment_failures.csv, which retry_failures reads.
     """
     processed_path = os.path.join('data', 'processed', f'{app_name}_cleaned.csv').replace('\\', '/')
     if not os.path.exists(processed_path):
@@ -45,30 +132,115 @@ def analyze_sentiment(app_name):
         return None
     
     try:
-        df = pd.read_csv(processed_path, encoding='utf-8')
+        df = pd.read_csv(processed_path, encoding='utf-8', dtype={'reviewId': str})
         print_flush(f"Loaded {len(df)} reviews for sentiment analysis of {app_name}")
         
         if df.empty:
             print_flush(f"Warning: No reviews to analyze for {app_name}")
             return None
-        
-        # Apply sentiment analysis to all reviews
+        if 'reviewId' not in df.columns or df['reviewId'].isna().any() or df['reviewId'].duplicated().any():
+            print_flush(f"Error: {processed_path} needs a unique reviewId for every review")
+            return None
+
+        df['text_hash'] = df['cleaned_content'].map(text_hash)
+        checkpoint_dir = os.path.join(CHECKPOINT_DIR, app_name).replace('\\', '/')
+        os.makedirs(checkpoint_dir, exist_ok=True)
+        results, next_chunk = current_results(df, checkpoint_dir)
+        resumed = results['sentiment'].notna().sum()
+        if len(results):
+            print_flush(f"Resuming {app_name}: {resumed} reviews already classified in {checkpoint_dir}")
+
+        # Main pass over reviews with no committed result yet
+        started = time.time()
+        pending = df[~df['reviewId'].isin(results['reviewId'])]
         print_flush(f"Classifying sentiments for {app_name}...")
-        df['sentiment'] = [classify_sentiment(text) for text in tqdm(df['cleaned_content'], desc=f"Processing {app_name}")]
-        
+        classified, next_chunk = classify_chunks(pending, checkpoint_dir, next_chunk, f"Processing {app_name}")
+
+        # Dedicated retry pass for failures, including ones from earlier runs
+        results, next_chunk = current_results(df, checkpoint_dir)
+        failed_ids = results.loc[results['sentiment'].isna(), 'reviewId']
+        retried = 0
+        if len(failed_ids):
+            print_flush(f"Retrying {len(failed_ids)} failed reviews for {app_name}...")
+            retried, next_chunk = classify_chunks(df[df['reviewId'].isin(failed_ids)], checkpoint_dir,
+                                                  next_chunk, f"Retrying {app_name}")
+            results, next_chunk = current_results(df, checkpoint_dir)
+        elapsed = time.time() - started
+
+        # Merge labels; reviews that still failed stay unlabelled rather than 'neutral'
+        labels = results.set_index('reviewId')
+        df = df.drop(columns=['text_hash'])
+        df['sentiment'] = df['reviewId'].map(labels['sentiment'])
+        failures = df.loc[df['sentiment'].isna(), ['reviewId', 'content']].copy()
+        failures['error'] = failures['reviewId'].map(labels['error'])
+        failures_path = os.path.join('data', 'processed', f'{app_name}_sentiment_failures.csv').replace('\\', '/')
+        if failures.empty:
+            if os.path.exists(failures_path):
+                os.remove(failures_path)
+        else:
+            write_atomic(failures, failures_path)
+
         # Save results
-        df.to_csv(processed_path, index=False, encoding='utf-8')
+        write_atomic(df, processed_path)
         print_flush(f"Saved sentiment results for {app_name} to {processed_path}")
+        # Run complete: failed rows stay retryable through the failures file
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+
+        print_flush(f"\nSentiment summary for {app_name}:")
+        print_flush(f"  Reviews: {len(df)} ({resumed} resumed from checkpoint; this run {classified} classified, "
+                    f"{retried} retried)")
+        print_flush(f"  Throughput: {(classified + retried) / elapsed if elapsed > 0 else 0:.1f} classifications/s "
+                    f"over {elapsed:.1f}s")
+        print_flush(f"  Failed: {len(failures)}" + (f" (see {failures_path}; retry with --retry-failures)" if len(failures) else ""))
         return df
     except Exception as e:
         print_flush(f"Error analyzing {app_name}: {e}")
         return None
 
+def retry_failures(app_name):
+    """
+    Reclassify only the reviews listed in the failures file, updating the
+    processed CSV and the failures file in place.
+    """
+    processed_path = os.path.join('data', 'processed', f'{app_name}_cleaned.csv').replace('\\', '/')
+    failures_path = os.path.join('data', 'processed', f'{app_name}_sentiment_failures.csv').replace('\\', '/')
+    if not os.path.exists(failures_path):
+        print_flush(f"No failures recorded for {app_name}")
+        return None
+    try:
+        df = pd.read_csv(processed_path, encoding='utf-8', dtype={'reviewId': str})
+        failed_ids = pd.read_csv(failures_path, encoding='utf-8', dtype={'reviewId': str})['reviewId']
+        df['sentiment'] = df['sentiment'].astype(object)
+        retry = df['reviewId'].isin(failed_ids) & df['sentiment'].isna()
+        print_flush(f"Retrying {retry.sum()} failed reviews for {app_name}...")
+        errors = {}
+        for idx in tqdm(df.index[retry], desc=f"Retrying {app_name}"):
+            try:
+                df.at[idx, 'sentiment'] = classify_sentiment(df.at[idx, 'cleaned_content'])
+            except Exception as e:
+                errors[df.at[idx, 'reviewId']] = f"{type(e).__name__}: {e}"
+        failures = df.loc[df['reviewId'].isin(list(errors)), ['reviewId', 'content']].copy()
+        failures['error'] = failures['reviewId'].map(errors)
+        write_atomic(df, processed_path)
+        if failures.empty:
+            os.remove(failures_path)
+        else:
+            write_atomic(failures, failures_path)
+        print_flush(f"Fixed {retry.sum() - len(failures)} reviews for {app_name}, {len(failures)} still failing")
+        return df
+    except Exception as e:
+        print_flush(f"Error retrying {app_name}: {e}")
+        return None
+
 if __name__ == "__main__":
     print_flush("Starting sentiment analysis...")
-    for app in ['ride', 'feres']:
+    # Apps run one after another: the shared pipeline is not thread-safe and
+    # torch already parallelises each call across cores
+    # --retry-failures reclassifies only the rows in each app's failures file
+    retry_only = '--retry-failures' in sys.argv[1:]
+    for app in app_names():
         print_flush(f"\nAnalyzing {app}...")
-        result = analyze_sentiment(app)  # Process all reviews
+        result = retry_failures(app) if retry_only else analyze_sentiment(app)
         if result is not None:
             print_flush(f"Completed sentiment analysis for {app} with {len(result)} reviews")
         else:
@@ -0,0 +1,195 @@
+import pandas as pd
+import numpy as np
+from datetime import datetime, timezone
+import json
+import os
+import shutil
+import time
+from src.app_registry import load_apps, run_per_app
+
+def print_flush(message):
+    print(message, flush=True)
+
+SNAPSHOT_FORMAT = 2
+SNAPSHOT_DIR = os.path.join('data', 'snapshot').replace('\\', '/')
+CURRENT_PATH = os.path.join(SNAPSHOT_DIR, 'CURRENT').replace('\\', '/')
+SENTIMENTS = ['positive', 'negative', 'neutral']
+TEXT_FIELDS = ['content']
+STALE_TMP_SECONDS = 3600  # Unfinished builds older than this are removed when pruning
+
+def pack_texts(texts):
+    """
+    Pack strings into one UTF-8 byte array plus offsets, so rows can be sliced from a memmap.
+    """
+    encoded = [str(t).encode('utf-8') if isinstance(t, str) else b'' for t in texts]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+    return offsets, data
+
+def theme_bits(texts, themes):
+    """
+    Bitmask per review of the themes whose keywords appear in its cleaned text.
+    """
+    bits = np.zeros(len(texts), dtype=np.uint32)
+    lowered = pd.Series(texts).fillna('').astype(str).str.lower()
+    for i, words in enumerate(themes.values()):
+        matches = lowered.apply(lambda x: any(kw in x for kw in words)).to_numpy()
+        bits[matches] |= np.uint32(1 << i)
+    return bits
+
+def pie_counts(codes, sentiments):
+    """
+    Sentiment counts for a pie chart from sentiment codes, largest slice first; -1 (unlabelled) is skipped.
+    """
+    codes = np.asarray(codes)
+    counts = pd.Series(np.bincount(codes[codes >= 0], minlength=len(sentiments)), index=sentiments)
+    return counts[counts > 0].sort_values(ascending=False, kind='stable')
+
+def build_snapshot(keep=3):
+    """
+    Precompute everything the dashboard renders and publish it as a new
+    versioned snapshot, then point CURRENT at it.
+    """
+    # Plotting and TF-IDF are only needed to build, so loading a snapshot stays light
+    from src.visualization import THEMES, compute_app_aggregates, format_ranking, pie_chart_png, rank_apps, theme_chart_png
+
+    print_flush("Building dashboard snapshot...")
+    assert len(THEMES) <= 32, "theme bitmask holds at most 32 themes"
+    apps = load_apps()
+
+    # Per-app sentiment counts and theme keyword tables, computed in parallel
+    aggregates = run_per_app(compute_app_aggregates)
+
+    frames = []
+    for app in apps:
+        processed_path = os.path.join('data', 'processed', f"{app['name']}_cleaned.csv").replace('\\', '/')
+        if not os.path.exists(processed_path):
+            print_flush(f"Error: Processed file not found at {processed_path}")
+            continue
+        df = pd.read_csv(processed_path, encoding='utf-8', usecols=lambda c: c in ['content', 'cleaned_content', 'sentiment'])
+        df['app'] = app['display_name']
+        frames.append(df)
+    if not frames:
+        print_flush("No processed reviews to snapshot")
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    app_list = [app['display_name'] for app in apps]
+
+    version = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')
+    tmp_dir = os.path.join(SNAPSHOT_DIR, f'.tmp-{version}').replace('\\', '/')
+    try:
+        os.makedirs(os.path.join(tmp_dir, 'charts'))
+
+        app_codes = pd.Categorical(df['app'], categories=app_list).codes.astype(np.int16)
+        sentiment_codes = pd.Categorical(df['sentiment'], categories=SENTIMENTS).codes.astype(np.int8)
+        np.save(os.path.join(tmp_dir, 'app.npy'), app_codes)
+        np.save(os.path.join(tmp_dir, 'sentiment.npy'), sentiment_codes)
+        np.save(os.path.join(tmp_dir, 'theme_bits.npy'), theme_bits(df['cleaned_content'] if 'cleaned_content' in df else [''] * len(df), THEMES))
+        for field in TEXT_FIELDS:
+            offsets, data = pack_texts(df[field])
+            np.save(os.path.join(tmp_dir, f'{field}_offsets.npy'), offsets)
+            np.save(os.path.join(tmp_dir, f'{field}_data.npy'), data)
+
+        # Prerendered charts for the unfiltered view, so the first render draws nothing
+        charts = {'pies': {}, 'themes': {}}
+        for code, app in enumerate(app_list):
+            counts = pie_counts(sentiment_codes[app_codes == code], SENTIMENTS)
+            if not counts.empty:
+                charts['pies'][app] = f'charts/pie_{code}.png'
+                with open(os.path.join(tmp_dir, charts['pies'][app]), 'wb') as f:
+                    f.write(pie_chart_png(f'{app} Sentiment Distribution', counts))
+        theme_data = [row for agg in aggregates.values() if agg is not None for row in agg['theme_data']]
+        theme_df = pd.DataFrame(theme_data, columns=['App', 'Sentiment', 'Theme', 'KeywordCount', 'Keywords'])
+        rankings = rank_apps(theme_df, app_list)
+        theme_rankings = {}
+        for sentiment in ['positive', 'negative']:
+            sentiment_df = theme_df[theme_df['Sentiment'] == sentiment]
+            if sentiment_df.empty:
+                continue
+            charts['themes'][sentiment] = f'charts/theme_{sentiment}.png'
+            with open(os.path.join(tmp_dir, charts['themes'][sentiment]), 'wb') as f:
+                f.write(theme_chart_png(sentiment_df, f"Theme Comparison: {' vs '.join(app_list)} ({sentiment.capitalize()} Sentiment)"))
+            theme_rankings[sentiment] = [[theme, format_ranking(counts)] for theme, counts in rankings.loc[sentiment].iterrows()]
+
+        manifest = {
+            'format': SNAPSHOT_FORMAT,
+            'version': version,
+            'created': datetime.now(timezone.utc).isoformat(),
+            'num_reviews': len(df),
+            'apps': app_list,
+            'sentiments': SENTIMENTS,
+            'themes': THEMES,
+            'sentiment_counts': {agg['app']: {k: int(v) for k, v in agg['sentiment_counts'].items()}
+                                 for agg in aggregates.values() if agg is not None},
+            'theme_data': theme_data,
+            'theme_rankings': theme_rankings,
+            'charts': charts
+        }
+        with open(os.path.join(tmp_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=4)
+
+        # Publish atomically: rename the finished directory, then swap the CURRENT pointer
+        version_dir = os.path.join(SNAPSHOT_DIR, version).replace('\\', '/')
+        os.rename(tmp_dir, version_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)  # Never leave a half-written build behind
+        raise
+    with open(f'{CURRENT_PATH}.tmp', 'w', encoding='utf-8') as f:
+        f.write(version)
+    os.replace(f'{CURRENT_PATH}.tmp', CURRENT_PATH)
+    print_flush(f"Published snapshot {version} with {len(df)} reviews to {version_dir}")
+
+    # Prune old versions; dashboards still mapping them keep their open pages
+    versions = sorted(d for d in os.listdir(SNAPSHOT_DIR) if os.path.isdir(os.path.join(SNAPSHOT_DIR, d)) and not d.startswith('.'))
+    for old in versions[:-keep]:
+        shutil.rmtree(os.path.join(SNAPSHOT_DIR, old), ignore_errors=True)
+
+    # Remove build directories left by killed builds, sparing any that may still be running
+    for d in os.listdir(SNAPSHOT_DIR):
+        path = os.path.join(SNAPSHOT_DIR, d)
+        if d.startswith('.tmp-') and time.time() - os.path.getmtime(path) > STALE_TMP_SECONDS:
+            shutil.rmtree(path, ignore_errors=True)
+    return version_dir
+
+def current_version(snapshot_dir=SNAPSHOT_DIR):
+    """
+    Version named by the CURRENT pointer, or None if no snapshot has been published.
+    """
+    current_path = os.path.join(snapshot_dir, 'CURRENT')
+    if not os.path.exists(current_path):
+        return None
+    with open(current_path, encoding='utf-8') as f:
+        return f.read().strip()
+
+def load_snapshot(version=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Memory-map a snapshot (the current one by default). Returns the manifest
+    dict with the arrays added under their file names, or None if no snapshot exists.
+    """
+    version = version or current_version(snapshot_dir)
+    if version is None:
+        return None
+    version_dir = os.path.join(snapshot_dir, version)
+    with open(os.path.join(version_dir, 'manifest.json'), encoding='utf-8') as f:
+        snapshot = json.load(f)
+    if snapshot.get('format') != SNAPSHOT_FORMAT:
+        print_flush(f"Snapshot format {snapshot.get('format')} is not supported (expected {SNAPSHOT_FORMAT})")
+        return None
+    for name in ['app', 'sentiment', 'theme_bits'] + [f'{field}_{part}' for field in TEXT_FIELDS for part in ['offsets', 'data']]:
+        snapshot[name] = np.load(os.path.join(version_dir, f'{name}.npy'), mmap_mode='r')
+    for paths in snapshot['charts'].values():
+        for key, path in paths.items():
+            with open(os.path.join(version_dir, path), 'rb') as f:
+                paths[key] = f.read()  # Chart path replaced by its PNG bytes
+    return snapshot
+
+def snapshot_texts(snapshot, rows, field='content'):
+    """
+    Decode the given rows of a text field from the memory-mapped snapshot.
+    """
+    offsets, data = snapshot[f'{field}_offsets'], snapshot[f'{field}_data']
+    return [bytes(data[offsets[i]:offsets[i + 1]]).decode('utf-8') for i in rows]
+
+if __name__ == "__main__":
+    build_snapshot()
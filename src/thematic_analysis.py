@@ -1,6 +1,7 @@
 import pandas as pd
 from sklearn.feature_extraction.text import TfidfVectorizer
 import os
+from src.app_registry import run_per_app
 
 def print_flush(message):
     print(message, flush=True)
@@ -35,23 +36,30 @@ def group_themes(keywords, app_name, sentiment):
             print_flush(f"{theme}: {kws}")
     return grouped
 
+def analyze_app_themes(app):
+    """
+    Extract and group positive and negative themes for one app.
+    """
+    processed_path = os.path.join('data', 'processed', f'{app}_cleaned.csv').replace('\\', '/')
+    if not os.path.exists(processed_path):
+        print_flush(f"Error: Processed file not found at {processed_path}")
+        return None
+    df = pd.read_csv(processed_path, encoding='utf-8')
+    print_flush(f"\nAnalyzing themes for {app}...")
+    results = {}
+    for sentiment in ['positive', 'negative']:
+        keywords = extract_keywords(df, sentiment)
+        if keywords:
+            results[sentiment] = group_themes(keywords, app, sentiment)
+    print_flush("-" * 50)
+    return results
+
 def thematic_analysis():
     """
-    Perform thematic analysis for both apps.
+    Perform thematic analysis for every app in the registry, in parallel.
     """
     print_flush("Starting thematic analysis...")
-    for app in ['ride', 'feres']:
-        processed_path = os.path.join('data', 'processed', f'{app}_cleaned.csv').replace('\\', '/')
-        if not os.path.exists(processed_path):
-            print_flush(f"Error: Processed file not found at {processed_path}")
-            continue
-        df = pd.read_csv(processed_path, encoding='utf-8')
-        print_flush(f"\nAnalyzing themes for {app}...")
-        for sentiment in ['positive', 'negative']:
-            keywords = extract_keywords(df, sentiment)
-            if keywords:
-                group_themes(keywords, app, sentiment)
-        print_flush("-" * 50)
+    return run_per_app(analyze_app_themes)
 
 if __name__ == "__main__":
     thematic_analysis()
\ No newline at end of file
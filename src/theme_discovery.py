@@ -0,0 +1,251 @@
+import pandas as pd
+import numpy as np
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.feature_extraction.text import CountVectorizer
+from scipy import sparse
+import hashlib
+import glob
+import os
+from src.app_registry import load_apps
+
+def print_flush(message):
+    print(message, flush=True)
+
+EMBEDDING_MODEL = 'sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2'
+EMBEDDING_DIR = os.path.join('data', 'embeddings').replace('\\', '/')
+# One cache per model, so vectors from different embedding spaces are never mixed
+CACHE_DIR = os.path.join(EMBEDDING_DIR, 'cache', EMBEDDING_MODEL.replace('/', '__')).replace('\\', '/')
+INDEX_PATH = os.path.join(EMBEDDING_DIR, 'reviews.hnsw').replace('\\', '/')
+INDEX_META_PATH = os.path.join(EMBEDDING_DIR, 'reviews_index.csv').replace('\\', '/')
+THEMES_PATH = os.path.join('outputs', 'discovered_themes.csv').replace('\\', '/')
+
+SHARD_SIZE = 10000   # Reviews embedded and written to the cache per shard
+CHUNK_SIZE = 10000   # Rows streamed through clustering and indexing at a time
+
+_model = None
+
+def load_embedding_model():
+    """
+    Load the sentence embedding model once, on CPU.
+    """
+    global _model
+    if _model is None:
+        from sentence_transformers import SentenceTransformer
+        print_flush(f"Loading embedding model {EMBEDDING_MODEL}...")
+        _model = SentenceTransformer(EMBEDDING_MODEL, device='cpu')
+    return _model
+
+def content_hash(text):
+    """
+    Stable 16-byte digest of a review's text, used as the embedding cache key.
+    """
+    return hashlib.blake2b(str(text).encode('utf-8'), digest_size=16).digest()
+
+def encode_texts(texts, batch_size=64):
+    """
+    Embed a list of texts into L2-normalised float32 vectors.
+    """
+    model = load_embedding_model()
+    vectors = model.encode(list(texts), batch_size=batch_size, convert_to_numpy=True,
+                           normalize_embeddings=True, show_progress_bar=False)
+    return vectors.astype(np.float32)
+
+def load_cache():
+    """
+    Load cached hashes (sorted) with their shard and row, plus memory-mapped shard vectors.
+    """
+    shards, hashes, shard_ids, rows = [], [], [], []
+    for shard_id, hash_path in enumerate(sorted(glob.glob(os.path.join(CACHE_DIR, 'shard_*_hashes.npy')))):
+        shard_hashes = np.load(hash_path)
+        shards.append(np.load(hash_path.replace('_hashes.npy', '_vectors.npy'), mmap_mode='r'))
+        hashes.append(shard_hashes)
+        shard_ids.append(np.full(len(shard_hashes), shard_id, dtype=np.int32))
+        rows.append(np.arange(len(shard_hashes), dtype=np.int64))
+    if not shards:
+        return np.array([], dtype='S16'), np.array([], dtype=np.int32), np.array([], dtype=np.int64), []
+    hashes = np.concatenate(hashes)
+    order = np.argsort(hashes)
+    return hashes[order], np.concatenate(shard_ids)[order], np.concatenate(rows)[order], shards
+
+def lookup_cache(keys, cache):
+    """
+    Return a boolean mask of keys present in the cache and their (shard, row) positions.
+    """
+    cached_hashes, shard_ids, rows, _ = cache
+    if len(cached_hashes) == 0:
+        return np.zeros(len(keys), dtype=bool), None, None
+    pos = np.searchsorted(cached_hashes, keys)
+    pos = np.minimum(pos, len(cached_hashes) - 1)
+    found = cached_hashes[pos] == keys
+    return found, shard_ids[pos], rows[pos]
+
+def embed_reviews(texts, output_path, batch_size=64):
+    """
+    Embed review texts in batches, reusing cached vectors by content hash.
+    New vectors are appended to the cache in shards, and the result is
+    written to a memory-mapped .npy file so memory stays bounded.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    texts = pd.Series(texts).fillna('').astype(str).reset_index(drop=True)
+    keys = np.array([content_hash(t) for t in texts], dtype='S16')
+
+    # Embed only unique texts that are not cached yet
+    found, _, _ = lookup_cache(keys, load_cache())
+    _, first = np.unique(keys, return_index=True)
+    missing = np.sort(first[~found[first]])
+    print_flush(f"{len(texts)} reviews, {len(first)} unique texts: {len(first) - len(missing)} reused from cache, "
+                f"{len(missing)} to compute")
+
+    next_shard = len(glob.glob(os.path.join(CACHE_DIR, 'shard_*_hashes.npy')))
+    for start in range(0, len(missing), SHARD_SIZE):
+        batch = missing[start:start + SHARD_SIZE]
+        vectors = encode_texts(texts.iloc[batch].tolist(), batch_size=batch_size)
+        prefix = os.path.join(CACHE_DIR, f'shard_{next_shard:05d}').replace('\\', '/')
+        np.save(f'{prefix}_vectors.npy', vectors)
+        np.save(f'{prefix}_hashes.npy', keys[batch])  # Hashes last, so a shard only counts once complete
+        next_shard += 1
+        print_flush(f"Embedded {min(start + SHARD_SIZE, len(missing))}/{len(missing)} new reviews")
+
+    # Gather vectors for every review, one chunk at a time
+    cache = load_cache()
+    _, _, _, shards = cache
+    dim = shards[0].shape[1] if shards else load_embedding_model().get_sentence_embedding_dimension()
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    embeddings = np.lib.format.open_memmap(output_path, mode='w+', dtype=np.float32, shape=(len(texts), dim))
+    for start in range(0, len(texts), CHUNK_SIZE):
+        _, shard_ids, rows = lookup_cache(keys[start:start + CHUNK_SIZE], cache)
+        for shard_id in np.unique(shard_ids):
+            in_shard = np.flatnonzero(shard_ids == shard_id)
+            embeddings[start + in_shard] = shards[shard_id][rows[in_shard]]
+    embeddings.flush()
+    print_flush(f"Saved {len(texts)} embeddings to {output_path}")
+    return np.load(output_path, mmap_mode='r')
+
+def cluster_embeddings(embeddings, n_clusters=12, batch_size=4096, n_epochs=3):
+    """
+    Cluster embeddings with mini-batch k-means, streaming over batch_size slices of the memmap.
+    """
+    n_clusters = min(n_clusters, len(embeddings))
+    batch_size = max(batch_size, n_clusters)  # partial_fit needs at least n_clusters rows per batch
+    kmeans = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=42, n_init=3)
+    for _ in range(n_epochs):
+        for start in range(0, len(embeddings), batch_size):
+            batch = np.asarray(embeddings[start:start + batch_size])
+            if len(batch) >= n_clusters:
+                kmeans.partial_fit(batch)
+    labels = np.concatenate([kmeans.predict(np.asarray(embeddings[start:start + CHUNK_SIZE]))
+                             for start in range(0, len(embeddings), CHUNK_SIZE)])
+    return kmeans, labels
+
+def label_clusters(texts, labels, n_clusters, top_n=8):
+    """
+    Name each cluster by its most distinctive terms (class-based TF-IDF).
+    """
+    vectorizer = CountVectorizer(max_features=50000, ngram_range=(1, 2), lowercase=False)
+    counts = vectorizer.fit_transform(pd.Series(texts).fillna('').astype(str))
+    membership = sparse.csr_matrix((np.ones(len(labels)), (labels, np.arange(len(labels)))),
+                                   shape=(n_clusters, len(labels)))
+    cluster_counts = (membership @ counts).toarray().astype(np.float64)
+    tf = cluster_counts / np.maximum(cluster_counts.sum(axis=1, keepdims=True), 1)
+    idf = np.log(1 + cluster_counts.sum() / np.maximum(cluster_counts.sum(axis=0), 1))
+    scores = tf * idf
+    terms = vectorizer.get_feature_names_out()
+    # Only positive scores name a cluster; clusters without any terms (e.g. empty reviews) get an empty label
+    return {cluster: [terms[i] for i in np.argsort(scores[cluster])[::-1][:top_n] if scores[cluster, i] > 0]
+            for cluster in range(n_clusters)}
+
+def build_similarity_index(embeddings, index_path=INDEX_PATH, M=16, ef_construction=200):
+    """
+    Build and persist an HNSW approximate nearest-neighbour index over the embeddings.
+    Item ids are row positions in the embeddings matrix.
+    """
+    import hnswlib
+    index = hnswlib.Index(space='cosine', dim=embeddings.shape[1])
+    index.init_index(max_elements=len(embeddings), ef_construction=ef_construction, M=M)
+    for start in range(0, len(embeddings), CHUNK_SIZE):
+        chunk = np.asarray(embeddings[start:start + CHUNK_SIZE])
+        index.add_items(chunk, np.arange(start, start + len(chunk)))
+    index.save_index(index_path)
+    print_flush(f"Saved similarity index with {len(embeddings)} reviews to {index_path}")
+    return index
+
+def load_similarity_index(index_path=INDEX_PATH, ef=64):
+    """
+    Load a persisted HNSW index for querying.
+    """
+    import hnswlib
+    index = hnswlib.Index(space='cosine', dim=load_embedding_model().get_sentence_embedding_dimension())
+    index.load_index(index_path)
+    index.set_ef(ef)
+    return index
+
+def find_similar_reviews(text, index, meta_df, k=10):
+    """
+    Return the k indexed reviews most similar to the given text.
+    """
+    k = min(k, len(meta_df))
+    ids, distances = index.knn_query(encode_texts([text]), k=k)
+    similar = meta_df.iloc[ids[0]].copy()
+    similar['similarity'] = 1 - distances[0]
+    return similar
+
+def discover_themes(n_clusters=12):
+    """
+    Embed all reviews, cluster them into emergent themes and build the similarity index.
+    """
+    print_flush("Starting theme discovery...")
+    frames = []
+    for app in load_apps():
+        processed_path = os.path.join('data', 'processed', f"{app['name']}_cleaned.csv").replace('\\', '/')
+        if not os.path.exists(processed_path):
+            print_flush(f"Error: Processed file not found at {processed_path}")
+            continue
+        df = pd.read_csv(processed_path, encoding='utf-8')
+        df['app'] = app['display_name']
+        frames.append(df)
+    if not frames:
+        print_flush("No reviews available for theme discovery")
+        return None
+    df = pd.concat(frames, ignore_index=True)
+    df = df[df['content'].notna()].reset_index(drop=True)
+    if df.empty:
+        print_flush("No reviews available for theme discovery")
+        return None
+
+    embeddings = embed_reviews(df['content'], os.path.join(EMBEDDING_DIR, 'reviews_embeddings.npy'))
+
+    print_flush(f"\nClustering {len(df)} reviews into {n_clusters} themes...")
+    kmeans, labels = cluster_embeddings(embeddings, n_clusters=n_clusters)
+    df['cluster'] = labels
+    cluster_terms = label_clusters(df['cleaned_content'], labels, kmeans.n_clusters)
+
+    # Summarise each theme and how often each app's reviews fall into it
+    app_shares = pd.crosstab(df['cluster'], df['app'], normalize='columns') * 100
+    summary = pd.DataFrame({
+        'cluster': range(kmeans.n_clusters),
+        'size': np.bincount(labels, minlength=kmeans.n_clusters),
+        'top_terms': [', '.join(cluster_terms[c]) for c in range(kmeans.n_clusters)]
+    })
+    for app in app_shares.columns:
+        summary[f'{app}_share'] = app_shares[app].reindex(summary['cluster']).fillna(0).round(2).values
+    if 'sentiment' in df:
+        summary['negative_share'] = (df.assign(neg=df['sentiment'] == 'negative')
+                                     .groupby('cluster')['neg'].mean()
+                                     .reindex(summary['cluster']).fillna(0).mul(100).round(2).values)
+
+    print_flush("\nDiscovered Themes:")
+    for _, row in summary.sort_values('size', ascending=False).iterrows():
+        shares = ', '.join(f"{app}: {row[f'{app}_share']:.1f}%" for app in app_shares.columns)
+        print_flush(f"  Theme {row['cluster']} ({row['size']} reviews; {shares}): {row['top_terms']}")
+
+    os.makedirs(os.path.dirname(THEMES_PATH), exist_ok=True)
+    summary.to_csv(THEMES_PATH, index=False, encoding='utf-8')
+    print_flush(f"\nSaved theme summary to {THEMES_PATH}")
+
+    meta_cols = [col for col in ['reviewId', 'app', 'content', 'sentiment', 'cluster'] if col in df]
+    df[meta_cols].to_csv(INDEX_META_PATH, index=False, encoding='utf-8')
+    build_similarity_index(embeddings)
+    return summary
+
+if __name__ == "__main__":
+    discover_themes()
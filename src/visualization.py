@@ -2,7 +2,9 @@ import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
 from sklearn.feature_extraction.text import TfidfVectorizer
+import io
 import os
+from src.app_registry import display_names, run_per_app
 
 def print_flush(message):
     print(message, flush=True)
@@ -19,127 +21,180 @@ def extract_keywords(df, sentiment_type, top_n=20):
     tfidf_matrix = vectorizer.fit_transform(texts)
     return vectorizer.get_feature_names_out().tolist()
 
+# Theme keyword lists, including Amharic equivalents
+THEMES = {
+    'Pricing': ['price', 'cost', 'expensive', 'cheap', 'fare', 'costly', 'affordable', 'ዋጋ', 'ወጪ', 'ውድ', 'ርካሽ'],
+    'Safety': ['safe', 'safety', 'dangerous', 'secure', 'risk', 'unsafe', 'ደህንነት', 'አደገኛ', 'አስተማማኝ'],
+    'Usability': ['app', 'interface', 'easy', 'user', 'navigate', 'friendly', 'bug', 'መተግበሪያ', 'ቀላል', 'ተጠቃሚ'],
+    'Service': ['driver', 'service', 'customer', 'support', 'staff', 'ride', 'ነዳይ', 'አገልግሎት', 'ደንበኛ', 'ድጋፍ'],
+    'Reliability': ['reliable', 'delay', 'wait', 'time', 'late', 'prompt', 'ታማኝ', 'መዘግየት', 'ጠብቅ', 'ጊዜ']
+}
+
 def group_themes(keywords):
     """
     Group keywords into themes, including Amharic equivalents.
     """
-    themes = {
-        'Pricing': ['price', 'cost', 'expensive', 'cheap', 'fare', 'costly', 'affordable', 'ዋጋ', 'ወጪ', 'ውድ', 'ርካሽ'],
-        'Safety': ['safe', 'safety', 'dangerous', 'secure', 'risk', 'unsafe', 'ደህንነት', 'አደገኛ', 'አስተማማኝ'],
-        'Usability': ['app', 'interface', 'easy', 'user', 'navigate', 'friendly', 'bug', 'መተግበሪያ', 'ቀላል', 'ተጠቃሚ'],
-        'Service': ['driver', 'service', 'customer', 'support', 'staff', 'ride', 'ነዳይ', 'አገልግሎት', 'ደንበኛ', 'ድጋፍ'],
-        'Reliability': ['reliable', 'delay', 'wait', 'time', 'late', 'prompt', 'ታማኝ', 'መዘግየት', 'ጠብቅ', 'ጊዜ']
-    }
-    grouped = {theme: [kw for kw in keywords if any(t in kw.lower() for t in words)] for theme, words in themes.items()}
+    grouped = {theme: [kw for kw in keywords if any(t in kw.lower() for t in words)] for theme, words in THEMES.items()}
     return grouped
 
+def theme_keyword_counts(df, app):
+    """
+    Count TF-IDF keywords per theme for an app's positive and negative reviews.
+    """
+    theme_data = []
+    for sentiment in ['positive', 'negative']:
+        keywords = extract_keywords(df, sentiment)
+        if not keywords:
+            continue
+        grouped = group_themes(keywords)
+        for theme, kws in grouped.items():
+            if kws:
+                theme_data.append({
+                    'App': app,
+                    'Sentiment': sentiment,
+                    'Theme': theme,
+                    'KeywordCount': len(kws),
+                    'Keywords': kws
+                })
+    return theme_data
+
+def compute_app_aggregates(app_name):
+    """
+    Load one app's processed reviews and precompute its sentiment and theme aggregates.
+    """
+    display = display_names()[app_name]
+    processed_path = os.path.join('data', 'processed', f'{app_name}_cleaned.csv').replace('\\', '/')
+    if not os.path.exists(processed_path):
+        print_flush(f"Error: Processed file not found at {processed_path}")
+        return None
+    df = pd.read_csv(processed_path, encoding='utf-8')
+    df['app'] = display
+
+    # Filter rows with sentiment labels
+    df = df[df['sentiment'].notna()]
+    return {
+        'app': display,
+        'sentiment_counts': df['sentiment'].value_counts(),
+        'theme_data': theme_keyword_counts(df, display)
+    }
+
+def rank_apps(theme_df, apps):
+    """
+    Pivot theme keyword counts into one column per app, indexed by (Sentiment, Theme).
+    Apps without keywords for a theme count as 0.
+    """
+    if theme_df.empty:
+        return pd.DataFrame(columns=apps)
+    counts = theme_df.pivot_table(index=['Sentiment', 'Theme'], columns='App', values='KeywordCount',
+                                  aggfunc='sum', fill_value=0)
+    return counts.reindex(columns=apps, fill_value=0)
+
+def format_ranking(counts):
+    """
+    Describe one row of rank_apps as an N-way ranking, e.g. 'RIDE (5) > Feres (3) = Zemen (3)'.
+    """
+    ordered = counts.sort_values(ascending=False, kind='stable')
+    ranking = f"{ordered.index[0]} ({ordered.iloc[0]})"
+    for (_, prev), (app, count) in zip(ordered.iloc[:-1].items(), ordered.iloc[1:].items()):
+        ranking += f" {'=' if count == prev else '>'} {app} ({count})"
+    return ranking
+
+def pie_chart_png(title, counts):
+    """
+    Render a sentiment pie chart for a Series of counts to PNG bytes.
+    """
+    fig, ax = plt.subplots(figsize=(6, 6))
+    ax.pie(counts, labels=counts.index, autopct='%1.1f%%', startangle=90,
+           colors=['#66b3ff', '#ff9999', '#99ff99'])  # Blue for neutral, red for negative, green for positive
+    ax.set_title(title)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
+def theme_chart_png(sentiment_df, title):
+    """
+    Render a theme comparison bar plot for one sentiment's theme rows to PNG bytes.
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    sns.barplot(data=sentiment_df, x='Theme', y='KeywordCount', hue='App', palette='Set2', ax=ax)
+    ax.set_title(title)
+    ax.set_xlabel('Theme')
+    ax.set_ylabel('Number of Keywords')
+    ax.tick_params(axis='x', labelrotation=45)
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buf.getvalue()
+
 def generate_visuals():
     """
-    Generate sentiment and thematic visualizations for both apps.
+    Generate sentiment and thematic visualizations for every app in the registry.
     """
     print_flush("Starting visualization...")
     os.makedirs('outputs', exist_ok=True)
-    
-    # Load data and add 'app' column
-    ride_df = pd.read_csv(os.path.join('data', 'processed', 'ride_cleaned.csv').replace('\\', '/'), encoding='utf-8')
-    feres_df = pd.read_csv(os.path.join('data', 'processed', 'feres_cleaned.csv').replace('\\', '/'), encoding='utf-8')
-    ride_df['app'] = 'RIDE'
-    feres_df['app'] = 'Feres'
-    
-    # Filter rows with sentiment labels
-    ride_df = ride_df[ride_df['sentiment'].notna()]
-    feres_df = feres_df[feres_df['sentiment'].notna()]
-    
+
+    # Per-app aggregates are computed in parallel
+    aggregates = {name: result for name, result in run_per_app(compute_app_aggregates).items() if result is not None}
+    apps = [aggregates[name]['app'] for name in aggregates]
+
     # Print sentiment distribution summary
     print_flush("\nSentiment Distribution Summary:")
-    for app, df in [('RIDE', ride_df), ('Feres', feres_df)]:
-        total = len(df)
-        if total == 0:
-            print_flush(f"No sentiment data for {app}")
+    for name, agg in aggregates.items():
+        counts = agg['sentiment_counts']
+        if counts.sum() == 0:
+            print_flush(f"No sentiment data for {agg['app']}")
             continue
-        sentiment_counts = df['sentiment'].value_counts(normalize=True) * 100
-        print_flush(f"{app}:")
-        for sentiment, percentage in sentiment_counts.items():
+        print_flush(f"{agg['app']}:")
+        for sentiment, percentage in (counts / counts.sum() * 100).items():
             print_flush(f"  {sentiment.capitalize()}: {percentage:.2f}%")
-    
+
     # Pie charts for each app
-    for app, df in [('RIDE', ride_df), ('Feres', feres_df)]:
-        if df.empty:
-            print_flush(f"Skipping pie chart for {app} (no data)")
+    for name, agg in aggregates.items():
+        sentiment_counts = agg['sentiment_counts']
+        if sentiment_counts.empty:
+            print_flush(f"Skipping pie chart for {agg['app']} (no data)")
             continue
-        sentiment_counts = df['sentiment'].value_counts()
-        plt.figure(figsize=(6, 6))
-        plt.pie(
-            sentiment_counts,
-            labels=sentiment_counts.index,
-            autopct='%1.1f%%',
-            startangle=90,
-            colors=['#66b3ff', '#ff9999', '#99ff99']  # Blue for neutral, red for negative, green for positive
-        )
-        plt.title(f'{app} Sentiment Distribution')
-        output_path = os.path.join('outputs', f'{app.lower()}_sentiment_pie.png').replace('\\', '/')
+        output_path = os.path.join('outputs', f'{name}_sentiment_pie.png').replace('\\', '/')
+        with open(output_path, 'wb') as f:
+            f.write(pie_chart_png(f"{agg['app']} Sentiment Distribution", sentiment_counts))
+        print_flush(f"Saved pie chart for {agg['app']} to {output_path}")
+
+    # Bar plot for sentiment comparison
+    sentiment_df = pd.DataFrame([
+        {'app': agg['app'], 'sentiment': sentiment, 'count': count}
+        for agg in aggregates.values() for sentiment, count in agg['sentiment_counts'].items()
+    ])
+    title_apps = ' vs '.join(apps)
+    if not sentiment_df.empty:
+        plt.figure(figsize=(8, 6))
+        sns.barplot(data=sentiment_df, x='sentiment', y='count', hue='app', palette='Set2')
+        plt.title(f'Sentiment Comparison: {title_apps}')
+        plt.xlabel('Sentiment')
+        plt.ylabel('Number of Reviews')
+        output_path = os.path.join('outputs', 'sentiment_comparison.png').replace('\\', '/')
         plt.savefig(output_path)
         plt.close()
-        print_flush(f"Saved pie chart for {app} to {output_path}")
-    
-    # Bar plot for sentiment comparison
-    combined = pd.concat([ride_df, feres_df])
-    plt.figure(figsize=(8, 6))
-    sns.countplot(data=combined, x='sentiment', hue='app', palette='Set2')
-    plt.title('Sentiment Comparison: RIDE vs Feres')
-    plt.xlabel('Sentiment')
-    plt.ylabel('Number of Reviews')
-    output_path = os.path.join('outputs', 'sentiment_comparison.png').replace('\\', '/')
-    plt.savefig(output_path)
-    plt.close()
-    print_flush(f"Saved sentiment comparison plot to {output_path}")
-    
-    # Thematic analysis and side-by-side bar plots for theme frequencies
+        print_flush(f"Saved sentiment comparison plot to {output_path}")
+
+    # Print grouped themes (for reference)
     print_flush("\nGenerating thematic visualizations...")
-    theme_data = []
-    for app, df in [('RIDE', ride_df), ('Feres', feres_df)]:
-        for sentiment in ['positive', 'negative']:
-            keywords = extract_keywords(df, sentiment)
-            if not keywords:
-                continue
-            grouped = group_themes(keywords)
-            
-            # Print grouped themes (for reference)
-            print_flush(f"\n{app} {sentiment.capitalize()} Themes:")
-            for theme, kws in grouped.items():
-                if kws:
-                    print_flush(f"{theme}: {kws}")
-            
-            # Collect theme frequencies for plotting
-            for theme, kws in grouped.items():
-                if kws:
-                    theme_data.append({
-                        'App': app,
-                        'Sentiment': sentiment,
-                        'Theme': theme,
-                        'KeywordCount': len(kws)
-                    })
-    
-    # Compare where RIDE beats Feres and vice versa
-    print_flush("\nThematic Comparison: Where Each App Outperforms")
-    theme_df = pd.DataFrame(theme_data)
+    theme_data = [row for agg in aggregates.values() for row in agg['theme_data']]
+    for row in theme_data:
+        print_flush(f"{row['App']} {row['Sentiment'].capitalize()} {row['Theme']}: {row['Keywords']}")
+
+    # Rank all apps on each theme
+    print_flush("\nThematic Comparison: App Rankings by Theme")
+    theme_df = pd.DataFrame(theme_data, columns=['App', 'Sentiment', 'Theme', 'KeywordCount', 'Keywords'])
+    rankings = rank_apps(theme_df, apps)
     for sentiment in ['positive', 'negative']:
         print_flush(f"\n{sentiment.capitalize()} Sentiment:")
-        sentiment_df = theme_df[theme_df['Sentiment'] == sentiment]
-        if sentiment_df.empty:
+        if sentiment not in rankings.index.get_level_values(0):
             print_flush(f"No themes for {sentiment} sentiment")
             continue
-        for theme in sentiment_df['Theme'].unique():
-            theme_subset = sentiment_df[sentiment_df['Theme'] == theme]
-            ride_count = theme_subset[theme_subset['App'] == 'RIDE']['KeywordCount'].sum()
-            feres_count = theme_subset[theme_subset['App'] == 'Feres']['KeywordCount'].sum()
-            if ride_count > feres_count:
-                print_flush(f"  {theme}: RIDE outperforms Feres ({ride_count} vs {feres_count} keywords)")
-            elif feres_count > ride_count:
-                print_flush(f"  {theme}: Feres outperforms RIDE ({feres_count} vs {ride_count} keywords)")
-            else:
-                print_flush(f"  {theme}: RIDE and Feres are equal ({ride_count} keywords)")
-    
+        for theme, counts in rankings.loc[sentiment].iterrows():
+            print_flush(f"  {theme}: {format_ranking(counts)} keywords")
+
     # Create side-by-side bar plots for theme frequencies
     if theme_data:
         for sentiment in ['positive', 'negative']:
@@ -147,15 +202,9 @@ def generate_visuals():
             if sentiment_df.empty:
                 print_flush(f"No themes for {sentiment} sentiment")
                 continue
-            plt.figure(figsize=(10, 6))
-            sns.barplot(data=sentiment_df, x='Theme', y='KeywordCount', hue='App', palette='Set2')
-            plt.title(f'Theme Comparison: RIDE vs Feres ({sentiment.capitalize()} Sentiment)')
-            plt.xlabel('Theme')
-            plt.ylabel('Number of Keywords')
-            plt.xticks(rotation=45)
             output_path = os.path.join('outputs', f'theme_comparison_{sentiment}.png').replace('\\', '/')
-            plt.savefig(output_path)
-            plt.close()
+            with open(output_path, 'wb') as f:
+                f.write(theme_chart_png(sentiment_df, f'Theme Comparison: {title_apps} ({sentiment.capitalize()} Sentiment)'))
             print_flush(f"Saved theme comparison bar plot for {sentiment} sentiment to {output_path}")
 
 if __name__ == "__main__":